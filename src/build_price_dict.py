@@ -17,7 +17,9 @@ https://google.github.io/styleguide/pyguide.html
 import numpy as np 
 import pprint
 
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+
+from src import get_json as GJ
 
 """
 Constant strings used in the base-prices JSON files.
@@ -26,6 +28,30 @@ PTYPE = 'product-type'
 OPT = 'options'
 BP = 'base-price'
 
+"""
+Unsigned dtypes a price array may use, smallest first.
+"""
+PRICE_DTYPES = (np.uint16, np.uint32, np.uint64)
+
+
+def get_dtype(max_price):
+	"""
+	Picks the smallest dtype of PRICE_DTYPES able to hold every price of a 
+	product.
+
+	Args:
+		max_price: The highest price of the product.
+
+	Returns: A numpy dtype.
+
+	Raises:
+		ValueError: If the price does not fit in any of PRICE_DTYPES.
+	"""
+	for dtype in PRICE_DTYPES:
+		if max_price <= np.iinfo(dtype).max:
+			return dtype
+	raise ValueError('A base-price of %d is too large.' % max_price)
+
 
 class ProductInfo:
 	""" 
@@ -40,6 +66,18 @@ class ProductInfo:
 			(For example, colour may be the array's 1st dimension, and size the 
 			second:
 			order: access_array[colour_option][size_option]).
+		rules: List of wildcard rules, from base-prices entries that leave out
+			one or more option categories. Each rule is a tuple of
+			(specified, price), where specified is a dict of
+			{dimension: frozenset of option indices} for the categories the 
+			entry does list. Kept in precedence order (see add_rules()).
+		rule_index: Index of the rules used by match_rule(), rebuilt whenever
+			rules are added. A list of precedence levels, most specific first,
+			each a dict of {tuple of dimensions: (masks, positions, prices)}
+			bucketing the rules listing those dimensions. masks holds, for 
+			each dimension, a dict of {option index: bitmask of the bucket's 
+			rules matching it}; positions and prices hold the position in 
+			rules and price of each rule of the bucket, by bit.
 	"""
 
 	def __init__(self):
@@ -48,6 +86,8 @@ class ProductInfo:
 		"""
 		self.option_dict = defaultdict(dict)
 		self.option_order = {}
+		self.rules = []
+		self.rule_index = []
 
 
 	def populate(self, product):
@@ -98,6 +138,140 @@ class ProductInfo:
 		return option_tuple
 
 
+	def is_rule(self, product):
+		"""
+		Checks whether a base-prices entry leaves out any option category of
+		this product, making it a wildcard rule rather than a set of cells.
+
+		Args:
+			product: An indexed entry from the base-prices json file.
+
+		Returns: True if the entry is a wildcard rule.
+		"""
+		return len(product[OPT]) < len(self.option_order)
+
+
+	def add_rules(self, products):
+		"""
+		Adds the given entries to this product's wildcard rules.
+
+		Rules are matched in precedence order: a rule listing more option 
+		categories beats one listing fewer, and on a tie the later entry wins 
+		(as later entries overwrite earlier ones in the price array). Prices 
+		set by entries listing every category always beat a rule.
+
+		Args:
+			products: Wildcard base-prices entries of this product, in file
+				order, and later than any existing rule.
+		"""
+		self.insert_rules([self.get_rule(product) for product in products])
+
+
+	def get_rule(self, product):
+		"""
+		Gets a base-prices entry in rule form, with the option indices of the
+		categories it lists.
+
+		Args:
+			product: An indexed entry from the base-prices json file.
+
+		Returns: A tuple of (specified, price), see the rules attribute.
+		"""
+		dimension = {category: index
+					for index, category in self.option_order.items()}
+
+		specified = {}
+		for option_category, options in product[OPT].items():
+			option_info = self.option_dict[option_category]
+			specified[dimension[option_category]] = frozenset(
+				option_info[option] for option in options)
+		return specified, product[BP]
+
+
+	def insert_rules(self, rules):
+		"""
+		Adds rules, already in (specified, price) form, keeping the rules in
+		precedence order (see add_rules()).
+
+		Args:
+			rules: List of (specified, price), in file order, and later than
+				any existing rule.
+		"""
+		# Stable sort on reversed file order keeps later rules first.
+		rules = rules[::-1] + self.rules
+		rules.sort(key=lambda rule: len(rule[0]), reverse=True)
+		self.rules = rules
+
+		levels = defaultdict(dict)
+		for position, (specified, price) in enumerate(rules):
+			dimensions = tuple(sorted(specified))
+			buckets = levels[len(dimensions)]
+			if dimensions not in buckets:
+				buckets[dimensions] = ({dimension: defaultdict(int) 
+										for dimension in dimensions}, [], [])
+			masks, positions, prices = buckets[dimensions]
+			bit = 1 << len(positions)
+			for dimension, indices in specified.items():
+				for index in indices:
+					masks[dimension][index] |= bit
+			positions.append(position)
+			prices.append(price)
+		self.rule_index = [levels[level] 
+							for level in sorted(levels, reverse=True)]
+
+
+	def match_rule(self, option_tuple):
+		"""
+		Finds the price of the highest precedence rule matching a combination.
+
+		Args:
+			option_tuple: A tuple of option indices, in option_order. An index
+				may be None for an option not listed by any entry; it only 
+				matches rules leaving that category out.
+
+		Returns: The price of the matching rule, or None if none match.
+		"""
+		# Within a bucket, the lowest matching bit is the first in rules.
+		for buckets in self.rule_index:
+			match = None
+			for masks, positions, prices in buckets.values():
+				mask = -1
+				for dimension, option_masks in masks.items():
+					mask &= option_masks.get(option_tuple[dimension], 0)
+					if not mask:
+						break
+				if mask:
+					bit = (mask & -mask).bit_length() - 1
+					if match is None or positions[bit] < match[0]:
+						match = (positions[bit], prices[bit])
+			if match is not None:
+				return match[1]
+		return None
+
+
+	def merge(self, other):
+		"""
+		Adds the options and option categories of another ProductInfo not
+		already in this one, in the other's index order. Merging the 
+		ProductInfos of several base-prices files in file order gives the same
+		indices as calling populate() on all of their entries in that order.
+
+		Args:
+			other: A ProductInfo, built from later base-prices entries.
+		"""
+		for index in range(len(other.option_order)):
+			option_category = other.option_order[index]
+			other_info = other.option_dict[option_category]
+			option_info = self.option_dict[option_category]
+			for option in sorted(other_info, key=other_info.get):
+				if option not in option_info:
+					option_info[option] = len(option_info)
+
+			if option_category in self.option_order.values():
+				continue
+			self.option_order[len(self.option_order)] = option_category
+
+
 	# Provide a string representation of ProductInfo.
 	def __repr__(self):
 		return str(self.option_dict)
@@ -107,30 +281,161 @@ class ProductInfo:
 	
 
 
+def build_product(products):
+	"""
+	Builds the ProductInfo and price array of a single product-type from its
+	base-prices entries alone. Entries leaving out an option category become
+	its wildcard rules.
+
+	The result can be used as is, or merged into a PriceDict holding earlier
+	entries of the same product-type with PriceDict.merge_product().
+
+	Args:
+		products: The base-prices entries of one product-type, in file order.
+
+	Returns: A tuple of (ProductInfo, price array, price_set, entry_rules),
+		where price_set is a boolean array of the cells set by an entry, and
+		entry_rules holds those entries in rule form (see 
+		ProductInfo.get_rule()), in file order.
+	"""
+	product_info = ProductInfo()
+	for product in products:
+		product_info.populate(product)
+	product_options = product_info.option_order
+	product_dict = product_info.option_dict
+
+	# Keep wildcard entries apart, to store them as rules.
+	rules = []
+	entries = []
+	for product in products:
+		if product_info.is_rule(product):
+			rules.append(product)
+		else:
+			entries.append(product)
+
+	# get_tuple provides array dimensions, init to 0.
+	# Assume prices can't be negative.
+	max_price = max([product[BP] for product in entries], default=0)
+	price_array = np.zeros(product_info.get_tuple(), dtype=get_dtype(max_price))
+	price_set = np.zeros(price_array.shape, dtype=bool)
+
+	# Update the price for every entry of this product
+	for product in entries:
+		# List to keep track of all indices we will be setting a price
+		update_indices = []
+
+		# We must iterate with both to ensure the option_order is respected
+		for key, option_category in product_options.items():
+			# Keep track of the indices of all presented options
+			curr_indices = []
+			# Go through each invidual option, and add its price_array index
+			for option in product[OPT][option_category]:
+				curr_indices.append(product_dict[option_category][option])
+			# Append this list to the update_indices, for use by np.ix_
+			update_indices.append(curr_indices)
+
+		# Actual assignment done here: Assigns all combinations using ix_
+		price_array[np.ix_(*update_indices)] = product[BP]
+		price_set[np.ix_(*update_indices)] = True
+
+	product_info.add_rules(rules)
+	entry_rules = [product_info.get_rule(product) for product in entries]
+	return product_info, price_array, price_set, entry_rules
+
+
+def build_products(pricejson):
+	"""
+	Calls build_product() on every product-type of a base-prices JSON object.
+
+	Args:
+		pricejson: A base-prices JSON object.
+
+	Returns: A dict of product-type: result of build_product(), in the order
+		product-types first appear in pricejson.
+	"""
+	products = defaultdict(list)
+	for product in pricejson:
+		products[product[PTYPE]].append(product)
+	return {product_name: build_product(entries)
+			for product_name, entries in products.items()}
+
+
 class PriceDict:
 	"""
 	Class to store and lookup (amortized constant time) prices from base-prices.
 
 	Note: This class can accept multiple base-prices JSON objects,
 		but build_lookup_array() must be called each time a new price JSON is 
-		added.
-
-	Note: PriceDict currently accepts prices up to unsigned-int 32 (A maximum 
-		price of 4294967295). There is no support for negative prices.
+		added. Entries of later JSON objects overwrite earlier ones. Entries
+		are not kept once their prices are in the price_array, only their 
+		option indices (see entry_rules).
+
+	Note: Base-prices entries that leave out an option category are wildcard
+		rules matching any option of that category. They are kept in each 
+		ProductInfo's rules rather than expanded into the price_array, and are
+		only consulted when a price_array cell is unset (0).
+
+	Note: In lazy mode, adding base-prices only records where the entries of
+		each product-type are: byte ranges in the file for 
+		add_base_price_file(), or index ranges in the JSON object for 
+		add_base_price() (which then keeps a reference to it). A product's
+		ProductInfo and array are built the first time it is looked up, 
+		through load_product(). Code reading lookup_dict or price_array 
+		directly must call load_product() first. Lazy PriceDicts are not 
+		thread-safe.
+
+	Note: Each product's array uses the smallest of uint16, uint32 and uint64
+		holding all of its prices (a maximum price of 18446744073709551615).
+		There is no support for negative prices. get_price() returns Python
+		ints, so arithmetic on prices cannot overflow.
 
 	Attribute:
 		price_array: numpy array storing prices for each price based on its 
 			option combinations.
 		lookup_dict: dict of ProductInfo to store option access indices in 
 			price_array.
+		lazy: True if products are only built when first looked up.
+		max_products: In lazy mode, the maximum number of built products kept
+			in memory, or None for no limit. The least recently used product
+			is dropped first (it is rebuilt on its next lookup).
+		sources: In lazy mode, list of the added base-prices: file paths, or
+			JSON objects.
+		ranges: In lazy mode, dict of lists of the ranges holding the entries
+			of each product-type, in the order they were added. Structure is:
+			dict['product-type'] = [(index in sources, start, end), ...]
+		resident: OrderedDict of the built products, least recently used 
+			first. Only used in lazy mode.
+		entry_rules: dict of lists of the entries that set cells of each 
+			product's price_array, in rule form (see ProductInfo.get_rule()),
+			in the order added. They become the product's rules if an option
+			category is added later. Only used in eager mode.
+		zero_set: dict of boolean arrays marking the cells an entry set to a
+			price of 0, for the few (built) products that have any, so that
+			get_price() can tell them from unset cells.
 	"""
 
-	def __init__(self):
+	def __init__(self, lazy=False, max_products=None):
 		"""
 		Initialize instance variables to default values.
+
+		Params:
+			lazy: Whether to build products on their first lookup.
+			max_products: LRU limit of built products in lazy mode.
+
+		Raises:
+			ValueError: If max_products is below 1.
 		"""
+		if max_products is not None and max_products < 1:
+			raise ValueError('max_products must be at least 1.')
 		self.price_array = {} 
 		self.lookup_dict = defaultdict(ProductInfo) 
+		self.lazy = lazy
+		self.max_products = max_products
+		self.sources = []
+		self.ranges = defaultdict(list)
+		self.entry_rules = defaultdict(list)
+		self.zero_set = {}
+		self.resident = OrderedDict()
 
 
 	def build_lookup_dict(self, pricejson):
@@ -139,12 +444,20 @@ class PriceDict:
 		through populate(), assign them all array index values to be used in 
 		assignment and lookup in the price_array.
 
+		In lazy mode, only the index ranges of each product's entries are 
+		recorded (see add_ranges()).
+
 		Note: 
 			Always call this before build_lookup_array!
 
 		Params:
 			pricejson: Base-prices json to pull options to assign array indices.
 		"""
+		if self.lazy:
+			self.add_ranges(pricejson, [(product[PTYPE], index, index + 1)
+									for index, product in enumerate(pricejson)])
+			return
+
 		for product in pricejson:
 			product_info = self.lookup_dict[product[PTYPE]]
 			product_info.populate(product)
@@ -152,50 +465,141 @@ class PriceDict:
 
 	def build_lookup_array(self, pricejson):
 		"""
-		After calling build_lookup_dict, this function runs through the 
-		base-prices json and generates numpy n-d arrays. A single array is 
+		After calling build_lookup_dict, this function generates numpy n-d 
+		arrays for each product-type in the base-prices json. A single array is
 		assigned to each product-type, and the number of dimensions and their 
 		sizes are equal to the number of option-categories and options 
-		themselves (i.e., category = size, option(s) = S, M, L.). This method
-		then populates each combination provided in pricejson with the provided 
-		price.
+		themselves (i.e., category = size, option(s) = S, M, L.). The prices of
+		pricejson are then laid over the existing ones, see merge_product().
 
 		Note:
 			This can be called multiple times, each time a new price JSON is 
-			added to the current PriceDict.
+			added to the current PriceDict. Does nothing in lazy mode.
 
 		Params:
 			pricejson: JSON object to get all prices and options from.
 		"""
+		if self.lazy:
+			return
 
-		# Create a numpy-zero array for each product.
-		# Assume prices can't be negative.
-		for product, product_info in self.lookup_dict.items():
-			# get_tuple provides array dimensions, init to 0.
-			product_tuple = self.lookup_dict[product].get_tuple()
-			self.price_array[product] = np.zeros(product_tuple, dtype=np.uint32)
+		for product_name, product in build_products(pricejson).items():
+			self.merge_product(product_name, *product)
 
-		# Update the price for every item in base-prices.json
-		for product in pricejson:
-			product_name = product[PTYPE]			
-			product_options = self.lookup_dict[product_name].option_order
-			product_dict = self.lookup_dict[product_name].option_dict
 
-			# List to keep track of all indices we will be setting a price
-			update_indices = []
+	def merge_product(self, product_name, product_info, price_array, 
+						price_set, entry_rules):
+		"""
+		Lays the result of build_product(), for entries added after every
+		entry already in this PriceDict, over the product's current prices.
+		This gives the same result as building the product from all of its 
+		entries at once.
 
-			# We must iterate with both to ensure the option_order is respected
-			for key, option_category in product_options.items():
-				# Keep track of the indices of all presented options
-				curr_indices = []
-				# Go through each invidual option, and add its price_array index
-				for option in product[OPT][option_category]:
-					curr_indices.append(product_dict[option_category][option])
-				# Append this list to the update_indices, for use by np.ix_
-				update_indices.append(curr_indices)
+		Option indices are remapped through ProductInfo.merge(), and the set
+		cells are copied with a single fancy-indexing assignment. If the new 
+		entries leave out an option category the product has, they are added
+		as rules instead, one per entry (as they would have been in a single
+		build).
 
-			# Actual assignment done here: Assigns all combinations using ix_
-			self.price_array[product_name][np.ix_(*update_indices)] = product[BP]
+		Params:
+			product_name: The product-type of the entries.
+			product_info: ProductInfo from build_product().
+			price_array: Price array from build_product().
+			price_set: Boolean array of the set cells, from build_product().
+			entry_rules: Entries setting those cells in rule form, from 
+				build_product().
+		"""
+		global_info = self.lookup_dict[product_name]
+		global_info.merge(product_info)
+		self._fit_array(product_name)
+
+		dimension = {category: index
+					for index, category in global_info.option_order.items()}
+		dimensions = []
+		index_maps = []
+		for index in range(len(product_info.option_order)):
+			option_category = product_info.option_order[index]
+			option_info = product_info.option_dict[option_category]
+			global_options = global_info.option_dict[option_category]
+			dimensions.append(dimension[option_category])
+			index_maps.append(np.array([global_options[option] for option in
+										sorted(option_info, key=option_info.get)],
+										dtype=np.intp))
+
+		# Rules are remapped to the global dimensions and indices.
+		def remap(rules):
+			return [({dimensions[axis]: frozenset(
+							int(index_maps[axis][index]) for index in indices)
+						for axis, indices in specified.items()}, price)
+					for specified, price in rules]
+
+		rules = remap(product_info.rules[::-1])
+		entry_rules = remap(entry_rules)
+		if len(dimensions) < len(global_info.option_order):
+			global_info.insert_rules(entry_rules + rules)
+			return
+		global_info.insert_rules(rules)
+		self.entry_rules[product_name] += entry_rules
+
+		# Lay the new cells over the old ones, in the global dimension order.
+		order = np.argsort(dimensions)
+		price_array = np.transpose(price_array, order)
+		price_set = np.transpose(price_set, order)
+		update_indices = np.ix_(*[index_maps[axis] for axis in order])
+
+		old_array = self.price_array[product_name]
+		dtype = np.promote_types(old_array.dtype, price_array.dtype)
+		new_array = old_array.astype(dtype)
+		new_array[update_indices] = np.where(price_set, price_array,
+											new_array[update_indices])
+
+		# Cells explicitly set to 0 look unset in the array: track them apart.
+		zero_set = self.zero_set.get(product_name)
+		new_zero_set = price_set & (price_array == 0)
+		if zero_set is not None or new_zero_set.any():
+			if zero_set is None:
+				zero_set = np.zeros(new_array.shape, dtype=bool)
+			zero_set[update_indices] = np.where(price_set, new_zero_set,
+												zero_set[update_indices])
+			self.zero_set[product_name] = zero_set
+			if not zero_set.any():
+				del self.zero_set[product_name]
+
+		# Shrink the dtype again if the new prices replaced the largest ones.
+		max_price = int(new_array.max()) if new_array.size else 0
+		self.price_array[product_name] = new_array.astype(get_dtype(max_price))
+
+
+	def _fit_array(self, product_name):
+		"""
+		Resizes a product's price array after options were added to its 
+		ProductInfo. New options get unset cells. If option categories were 
+		added, the existing cells become rules, as their entries now leave out
+		a category.
+		"""
+		product_info = self.lookup_dict[product_name]
+		shape = product_info.get_tuple()
+		old_array = self.price_array.get(product_name)
+		if old_array is None:
+			self.price_array[product_name] = np.zeros(shape, dtype=np.uint16)
+			return
+		if old_array.shape == shape:
+			return
+
+		new_array = np.zeros(shape, dtype=old_array.dtype)
+		zero_set = self.zero_set.pop(product_name, None)
+		if old_array.ndim < len(shape):
+			# Older than any rule of the same precedence: insert them first.
+			rules = product_info.rules
+			product_info.rules = []
+			product_info.insert_rules(self.entry_rules.pop(product_name, []))
+			product_info.insert_rules(rules[::-1])
+		else:
+			old_cells = tuple(slice(0, size) for size in old_array.shape)
+			new_array[old_cells] = old_array
+			if zero_set is not None:
+				self.zero_set[product_name] = np.zeros(shape, dtype=bool)
+				self.zero_set[product_name][old_cells] = zero_set
+		self.price_array[product_name] = new_array
 
 
 	def add_base_price(self, pricejson):
@@ -213,6 +617,128 @@ class PriceDict:
 		self.build_lookup_array(pricejson)
 
 
+	def add_base_price_file(self, path):
+		"""
+		Same as add_base_price(), from a local base-prices file. In lazy mode,
+		the file is scanned for the byte ranges of each product's entries, and
+		none of them are kept in memory.
+
+		Params:
+			path: Path to a local base-prices json file.
+
+		Raises:
+			ValueError: If the file fails to load (see get_JSON()).
+		"""
+		if not self.lazy:
+			self.add_base_price(GJ.get_JSON(path))
+			return
+
+		self.add_ranges(path, [(product[PTYPE], start, end) for product, 
+								start, end in GJ.scan_JSON(path)])
+
+
+	def add_ranges(self, source, ranges):
+		"""
+		Records where the entries of each product-type are in a source, for
+		lazy mode. Consecutive entries of the same product-type are recorded
+		as a single range. Products with new entries are dropped, so they are
+		rebuilt with them.
+
+		Params:
+			source: A base-prices file path or JSON object.
+			ranges: List of (product-type, start, end) for each entry, in 
+				order: byte ranges in a file, or index ranges in a JSON object.
+		"""
+		source_index = len(self.sources)
+		self.sources.append(source)
+
+		last = None
+		for product_name, start, end in ranges:
+			product_ranges = self.ranges[product_name]
+			if last == product_name:
+				product_ranges[-1] = (source_index, product_ranges[-1][1], end)
+			else:
+				product_ranges.append((source_index, start, end))
+				self.unload_product(product_name)
+			last = product_name
+
+
+	def read_entries(self, product):
+		"""
+		Reads back the entries of a product-type from its recorded ranges.
+
+		Params:
+			product: The product-type to read.
+
+		Returns: A list of its base-prices entries, in the order added.
+		"""
+		entries = []
+		for source_index, start, end in self.ranges[product]:
+			source = self.sources[source_index]
+			if isinstance(source, str):
+				entries += GJ.read_JSON_range(source, start, end)
+			else:
+				entries += source[start:end]
+		return entries
+
+
+	def products(self):
+		"""
+		Helper method to list every product-type, built or not.
+
+		Returns: A list of product-types, in the order they were first added.
+		"""
+		if self.lazy:
+			return list(self.ranges)
+		return list(self.price_array)
+
+
+	def load_product(self, product):
+		"""
+		Makes sure a product's ProductInfo and array are built. In lazy mode,
+		builds them from the recorded ranges if needed, marks the product as
+		most recently used and drops the least recently used products beyond
+		max_products. Does nothing for unknown products or in eager mode.
+
+		Params:
+			product: The product-type to load.
+		"""
+		if not self.lazy or product not in self.ranges:
+			return
+
+		if product in self.resident:
+			self.resident.move_to_end(product)
+			return
+
+		product_info, price_array, price_set, _ = build_product(
+			self.read_entries(product))
+		self.lookup_dict[product] = product_info
+		self.price_array[product] = price_array
+		zero_set = price_set & (price_array == 0)
+		if zero_set.any():
+			self.zero_set[product] = zero_set
+		self.resident[product] = True
+
+		while (self.max_products is not None and 
+				len(self.resident) > self.max_products):
+			self.unload_product(next(iter(self.resident)))
+
+
+	def unload_product(self, product):
+		"""
+		Drops a built product from memory in lazy mode. It is rebuilt on its
+		next load_product().
+
+		Params:
+			product: The product-type to drop.
+		"""
+		if self.resident.pop(product, None) is None:
+			return
+		del self.lookup_dict[product]
+		del self.price_array[product]
+		self.zero_set.pop(product, None)
+
+
 	def get_price(self, product, option_tuple):
 		"""
 		Helper method to get a price from the lookup array.
@@ -220,11 +746,57 @@ class PriceDict:
 		Params:
 			product: The product-type of the item
 			option_tuple: A tuple containing the indices to be used in the 
-			lookup
+			lookup. An index may be None for an option not listed by any
+			entry, in which case only wildcard rules can price it.
 
 		Returns: The requested price, as an int.
+
+		Raises:
+			KeyError: If an option is unknown and no wildcard rule matches.
+		"""
+		self.load_product(product)
+		product_info = self.lookup_dict[product]
+
+		price = 0
+		if None not in option_tuple:
+			# Convert from a numpy scalar, which may be as small as uint16.
+			price = int(self.price_array[product][option_tuple])
+			# Cells an entry set to 0 beat rules, as any other set cell.
+			zero_set = self.zero_set.get(product)
+			if (price or not product_info.rules or 
+					(zero_set is not None and zero_set[option_tuple])):
+				return price
+
+		rule_price = product_info.match_rule(option_tuple)
+		if rule_price is not None:
+			return rule_price
+		if None in option_tuple:
+			raise KeyError(product)
+		return price
+
+
+	def memory_report(self):
+		"""
+		Reports the memory use of each built product's price array.
+
+		Returns: A dict of product-type: dict with the keys
+			'nbytes': size of the array, in bytes.
+			'fill-ratio': share of array cells holding a price (0 to 1),
+				counting cells an entry set to 0.
+			'dtype': name of the array's dtype, such as 'uint16'.
 		"""
-		return self.price_array[product][option_tuple]
+		report = {}
+		for product, price_array in self.price_array.items():
+			fill_ratio = 0
+			if price_array.size:
+				price_set = price_array != 0
+				if product in self.zero_set:
+					price_set |= self.zero_set[product]
+				fill_ratio = np.count_nonzero(price_set) / price_array.size
+			report[product] = {'nbytes': price_array.nbytes,
+								'fill-ratio': fill_ratio,
+								'dtype': price_array.dtype.name}
+		return report
 
 
 	def get_index(self, product, option_category, option):
@@ -238,6 +810,7 @@ class PriceDict:
 
 		Returns: The request option index, as an int.
 		"""
+		self.load_product(product)
 		return self.lookup_dict[product].option_dict[option_category][option]
 
 
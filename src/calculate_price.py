@@ -38,6 +38,8 @@ def calculate(cartjson, pricedict):
 	for item in cartjson:
 
 		item_name = item[PTYPE]
+		# Build the product first if pricedict is lazy.
+		pricedict.load_product(item_name)
 
 		# Use a tuple to generate in-order indices of options, from the dict.
 		lookup_indices = ()
@@ -48,15 +50,16 @@ def calculate(cartjson, pricedict):
 		# Iterate through each option in order
 		for option_category in option_order.values():
 			item_option = item[OPT][option_category]
-			# Get the index of said option and append it to the tuple
-			lookup_indices += (pricedict.get_index( item_name, 
-													option_category, 
-													item_option), )
+			# Get the index of said option and append it to the tuple.
+			# Unlisted options are None, and can only match wildcard rules.
+			lookup_indices += (option_lookup[option_category].get(item_option),)
 
 		# Formula: base_price + round(base_price * markup) * quantity 
 		# Round down the prices in cents after markup percentage calculation.
+		# get_price returns an int, and floor division keeps it exact, so
+		# large prices and quantities neither overflow nor lose precision.
 		item_base_price = pricedict.get_price(item_name, lookup_indices)
-		item_markup = int((item_base_price * item[MKUP])/100)
+		item_markup = int((item_base_price * item[MKUP]) // 100)
 		item_price = (item_base_price + item_markup) * item[QT]
 
 		total_price += item_price
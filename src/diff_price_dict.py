@@ -0,0 +1,281 @@
+"""
+diff_price_dict.py compares two PriceDicts (or two base-prices JSON objects)
+and reports which price cells changed between them, so that only the carts
+touching those cells need to be repriced.
+
+Because two PriceDicts may assign different array indices to the same option
+(indices depend on the order options were first seen), cells are reported by
+option name rather than by raw array index. A cell is a tuple of option names,
+ordered by the sorted option-category names of its product. For example, a
+hoodie cell is ('dark', 'small') for colour 'dark' and size 'small'.
+
+CartIndex is a reverse index from those cells to the carts that use them.
+
+This file uses Google's Python style guide:
+https://google.github.io/styleguide/pyguide.html
+"""
+import numpy as np
+
+from collections import defaultdict
+
+from src import build_price_dict as BPD
+
+# Constants used in JSON files.
+PTYPE = 'product-type'
+OPT = 'options'
+
+"""
+Marker used in a diff for products that were added, removed, or had their
+option categories or wildcard rules change. Every cell of such a product is
+considered changed.
+"""
+ALL_CELLS = None
+
+
+def get_categories(product_info):
+	"""
+	Gets the option categories of a product in canonical (sorted) order.
+
+	Args:
+		product_info: The ProductInfo of the product.
+
+	Returns: A tuple of option-category names, sorted.
+	"""
+	return tuple(sorted(product_info.option_order.values()))
+
+
+def get_cell(item, categories):
+	"""
+	Gets the cell of a cart item: the item's option names ordered by category.
+
+	Args:
+		item: An item from a cart JSON object.
+		categories: Canonical option categories of the item's product, as
+			returned by get_categories().
+
+	Returns: A tuple of option names.
+	"""
+	return tuple(item[OPT][option_category] for option_category in categories)
+
+
+def _canonical_array(product_info, price_array, categories):
+	"""
+	Transposes a product's price array so its dimensions follow the canonical
+	category order instead of the PriceDict's option_order.
+	"""
+	dimension = {category: index
+				for index, category in product_info.option_order.items()}
+	return np.transpose(price_array, [dimension[c] for c in categories])
+
+
+def _named_rules(product_info):
+	"""
+	Gets a product's wildcard rules with option names instead of indices, so
+	rules of two PriceDicts can be compared.
+	"""
+	named_rules = []
+	for specified, price in product_info.rules:
+		named = {}
+		for dimension, indices in specified.items():
+			option_category = product_info.option_order[dimension]
+			option_info = product_info.option_dict[option_category]
+			named[option_category] = frozenset(
+				option for option, index in option_info.items()
+				if index in indices)
+		named_rules.append((named, price))
+	return named_rules
+
+
+def diff_product(old_info, old_array, new_info, new_array):
+	"""
+	Compares the price arrays of one product from two PriceDicts.
+
+	Both arrays are laid out on a shared index space holding the union of
+	their options (options the old PriceDict never had are appended after its
+	own), with unpriced cells left at 0. Changed cells are then found with a
+	single array comparison.
+
+	Args:
+		old_info: ProductInfo of the product in the old PriceDict.
+		old_array: price_array of the product in the old PriceDict.
+		new_info: ProductInfo of the product in the new PriceDict.
+		new_array: price_array of the product in the new PriceDict.
+
+	Returns: A set of changed cells, or ALL_CELLS if the option categories
+		or the wildcard rules of the product differ.
+	"""
+	categories = get_categories(old_info)
+	if categories != get_categories(new_info):
+		return ALL_CELLS
+	# Wildcard rules are not expanded into cells, so any change to them
+	# may reprice any cell.
+	if _named_rules(old_info) != _named_rules(new_info):
+		return ALL_CELLS
+
+	union_names = []
+	old_indices = []
+	new_indices = []
+	for option_category in categories:
+		old_options = old_info.option_dict[option_category]
+		new_options = new_info.option_dict[option_category]
+
+		# Old options keep their index, new ones are appended after them.
+		names = sorted(old_options, key=old_options.get)
+		names += [option for option in sorted(new_options, key=new_options.get)
+					if option not in old_options]
+		position = {option: index for index, option in enumerate(names)}
+
+		union_names.append(names)
+		old_indices.append(range(len(old_options)))
+		new_indices.append([position[option] for option in
+							sorted(new_options, key=new_options.get)])
+
+	shape = tuple(len(names) for names in union_names)
+	old_union = np.zeros(shape, dtype=old_array.dtype)
+	new_union = np.zeros(shape, dtype=new_array.dtype)
+	old_union[np.ix_(*old_indices)] = _canonical_array(
+		old_info, old_array, categories)
+	new_union[np.ix_(*new_indices)] = _canonical_array(
+		new_info, new_array, categories)
+
+	changed = set()
+	for indices in np.argwhere(old_union != new_union):
+		changed.add(tuple(union_names[dimension][index]
+						for dimension, index in enumerate(indices)))
+	return changed
+
+
+def diff(old_pricedict, new_pricedict):
+	"""
+	Finds every price cell that differs between two PriceDicts.
+
+	Args:
+		old_pricedict: The PriceDict currently used to price carts.
+		new_pricedict: The PriceDict built from the new base-prices.
+
+	Returns: A dict mapping each changed product-type to its set of changed
+		cells, or to ALL_CELLS if the product was added, removed, or had its
+		option categories or wildcard rules change. Unchanged products are
+		left out.
+	"""
+	changes = {}
+	old_products = set(old_pricedict.products())
+	new_products = set(new_pricedict.products())
+
+	for product in old_products | new_products:
+		if product not in old_products or product not in new_products:
+			changes[product] = ALL_CELLS
+			continue
+
+		# Lazy PriceDicts build products on demand.
+		old_pricedict.load_product(product)
+		new_pricedict.load_product(product)
+		changed = diff_product(old_pricedict.lookup_dict[product],
+								old_pricedict.price_array[product],
+								new_pricedict.lookup_dict[product],
+								new_pricedict.price_array[product])
+		if changed is ALL_CELLS or changed:
+			changes[product] = changed
+
+	return changes
+
+
+def diff_base_prices(old_pricejson, new_pricejson):
+	"""
+	Helper function to diff two base-prices JSON objects directly.
+
+	Args:
+		old_pricejson: The base-prices JSON object currently in use.
+		new_pricejson: The new base-prices JSON object.
+
+	Returns: The same as diff().
+	"""
+	old_pricedict = BPD.PriceDict()
+	old_pricedict.add_base_price(old_pricejson)
+	new_pricedict = BPD.PriceDict()
+	new_pricedict.add_base_price(new_pricejson)
+	return diff(old_pricedict, new_pricedict)
+
+
+class CartIndex:
+	"""
+	Reverse index from price cells to the open carts that use them.
+
+	Attributes:
+		cell_index: dict of sets. Structure is:
+			dict[(product-type, cell)] = {cart_id, ...}
+		product_index: dict of sets of the carts holding each product-type.
+			Structure is: dict[product-type] = {cart_id, ...}
+		cart_keys: dict keeping the (product-type, cell) keys of each cart,
+			used to remove a cart from the index.
+	"""
+
+	def __init__(self):
+		"""
+		Initialize instance variables to default or empty values.
+		"""
+		self.cell_index = defaultdict(set)
+		self.product_index = defaultdict(set)
+		self.cart_keys = {}
+
+
+	def add_cart(self, cart_id, cartjson, pricedict):
+		"""
+		Adds (or replaces) a cart in the index.
+
+		Args:
+			cart_id: Any hashable identifier for the cart.
+			cartjson: A JSON object containing the cart.
+			pricedict: The PriceDict the cart is priced with. Used to know
+				which of the item's options take part in its price.
+		"""
+		self.remove_cart(cart_id)
+
+		keys = set()
+		for item in cartjson:
+			product = item[PTYPE]
+			pricedict.load_product(product)
+			categories = get_categories(pricedict.lookup_dict[product])
+			keys.add((product, get_cell(item, categories)))
+
+		for key in keys:
+			self.cell_index[key].add(cart_id)
+			self.product_index[key[0]].add(cart_id)
+		self.cart_keys[cart_id] = keys
+
+
+	def remove_cart(self, cart_id):
+		"""
+		Removes a cart from the index. Does nothing if it is not indexed.
+
+		Args:
+			cart_id: The identifier the cart was added with.
+		"""
+		for key in self.cart_keys.pop(cart_id, ()):
+			self.cell_index[key].discard(cart_id)
+			if not self.cell_index[key]:
+				del self.cell_index[key]
+
+			product_carts = self.product_index[key[0]]
+			product_carts.discard(cart_id)
+			if not product_carts:
+				del self.product_index[key[0]]
+
+
+	def affected_carts(self, changes):
+		"""
+		Gets the carts that must be repriced after a price change.
+
+		Args:
+			changes: A diff, as returned by diff() or diff_base_prices().
+
+		Returns: A set of cart ids.
+		"""
+		affected = set()
+		for product, cells in changes.items():
+			if cells is ALL_CELLS:
+				affected |= self.product_index.get(product, set())
+				continue
+			for cell in cells:
+				affected |= self.cell_index.get((product, cell), set())
+		return affected
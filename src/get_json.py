@@ -75,6 +75,111 @@ def get_JSON(jsonobject):
 		raise ValueError(VAL_ERR_STRING)
 
 
+def _decode_array(text, offset=0, bracketed=True):
+	"""
+	Generator over the elements of a JSON array held in text, yielding each
+	element with its start and end positions (as str indices) in text.
+
+	If bracketed is False, text holds the elements only, separated by commas,
+	without the enclosing '[' and ']'.
+	"""
+	decoder = json.JSONDecoder()
+	end = len(text)
+
+	def skip(pos):
+		while pos < end and text[pos] in ' \t\n\r':
+			pos += 1
+		return pos
+
+	def closed(pos):
+		# Whether pos is at the end of the array (and of text, if bracketed).
+		if not bracketed:
+			return pos >= end
+		return text[pos:pos + 1] == ']' and skip(pos + 1) >= end
+
+	pos = skip(offset)
+	if bracketed:
+		if text[pos:pos + 1] != '[':
+			raise ValueError(VAL_ERR_STRING)
+		pos = skip(pos + 1)
+	if closed(pos):
+		return
+
+	while True:
+		element, element_end = decoder.raw_decode(text, pos)
+		yield element, pos, element_end
+		# Elements must be followed by a comma and another element, or by
+		# the end of the array, as json.loads() requires.
+		pos = skip(element_end)
+		if text[pos:pos + 1] == ',':
+			pos = skip(pos + 1)
+		elif closed(pos):
+			return
+		else:
+			raise ValueError(VAL_ERR_STRING)
+
+
+def scan_JSON(jsonobject):
+	"""
+	scan_JSON() goes through a local JSON file holding an array, and yields
+	each element along with the byte range it takes in the file. The ranges
+	can later be read back with read_JSON_range(), without keeping the
+	elements in memory in the meantime.
+
+	Args:
+		jsonobject: Path to a local json file holding an array.
+
+	Yields: Tuples of (element, start byte, end byte).
+
+	Raises:
+		ValueError: If jsonobject is not a local file holding a JSON array.
+	"""
+	try:
+		with open(os.path.abspath(jsonobject), 'rb') as file:
+			text = file.read().decode('utf-8')
+	except (FileNotFoundError, UnicodeDecodeError):
+		raise ValueError(VAL_ERR_STRING)
+
+	# Keep a running byte count, as str indices differ for non-ASCII text.
+	char_pos = 0
+	byte_pos = 0
+	try:
+		for element, start, end in _decode_array(text):
+			byte_pos += len(text[char_pos:start].encode('utf-8'))
+			byte_start = byte_pos
+			byte_pos += len(text[start:end].encode('utf-8'))
+			char_pos = end
+			yield element, byte_start, byte_pos
+	except ValueError:
+		raise ValueError(VAL_ERR_STRING)
+
+
+def read_JSON_range(jsonobject, start, end):
+	"""
+	read_JSON_range() reads back consecutive array elements found by 
+	scan_JSON(), from the start of the first one to the end of the last one.
+
+	Args:
+		jsonobject: Path to the local json file given to scan_JSON().
+		start: Start byte of the first element.
+		end: End byte of the last element.
+
+	Returns: A list of the elements in the range.
+
+	Raises:
+		ValueError: If the file cannot be read, or has changed since it was
+			scanned.
+	"""
+	try:
+		with open(os.path.abspath(jsonobject), 'rb') as file:
+			file.seek(start)
+			text = file.read(end - start).decode('utf-8')
+		return [element for element, _, _ in _decode_array(text,
+															bracketed=False)]
+	except (FileNotFoundError, UnicodeDecodeError, ValueError):
+		raise ValueError(VAL_ERR_STRING)
+
+
 # Define get_JSON to be entry point if this file is used standalone
 if __name__ == "__main__":
 	try:
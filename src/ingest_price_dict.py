@@ -0,0 +1,97 @@
+"""
+ingest_price_dict.py loads many base-prices files into a single PriceDict.
+
+Worker processes fetch and parse each file (through get_JSON), and build the
+ProductInfo and price array of each of its product-types on their own (see
+build_price_dict.build_product()). Only these compact results are sent back;
+the parsed JSON stays in the worker. The results are then merged in file order
+with PriceDict.merge_product(), which only remaps option indices and copies
+the set cells, so the PriceDict ends up the same as if add_base_price() was
+called on each file in turn.
+
+For a lazy PriceDict, workers only scan each (local) file for the byte ranges
+of each product's entries, as add_base_price_file() would.
+
+This file uses Google's Python style guide:
+https://google.github.io/styleguide/pyguide.html
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+from src import build_price_dict as BPD
+from src import get_json as GJ
+
+# Constants used in JSON files.
+PTYPE = 'product-type'
+
+
+def build_source(source):
+	"""
+	Worker function: loads one base-prices file and builds each of its
+	product-types.
+
+	Args:
+		source: Reference to a base-prices json file or URL.
+
+	Returns: A dict of product-type: result of build_product().
+	"""
+	return BPD.build_products(GJ.get_JSON(source))
+
+
+def scan_source(source):
+	"""
+	Worker function, for lazy PriceDicts: scans one local base-prices file for
+	the byte range of each entry.
+
+	Args:
+		source: Path to a local base-prices json file.
+
+	Returns: A list of (product-type, start byte, end byte), in file order.
+	"""
+	return [(product[PTYPE], start, end)
+			for product, start, end in GJ.scan_JSON(source)]
+
+
+def ingest(sources, pricedict=None, processes=None):
+	"""
+	Loads base-prices files in parallel and adds them to a PriceDict.
+
+	Args:
+		sources: A list of references to base-prices json files or URLs
+			(only local files for a lazy PriceDict). Later files overwrite
+			earlier ones, as with add_base_price().
+		pricedict: The PriceDict to add the files to. A new one is made if
+			not provided.
+		processes: Number of worker processes. Defaults to the number of
+			CPUs; 1 loads every file in this process.
+
+	Returns: The PriceDict, with every file added.
+
+	Raises:
+		ValueError: If a file fails to load (see get_JSON()).
+		HTTPError: If a URL returned an HTTP status error code.
+	"""
+	if pricedict is None:
+		pricedict = BPD.PriceDict()
+	worker = scan_source if pricedict.lazy else build_source
+
+	executor = None
+	if processes == 1:
+		loaded = map(worker, sources)
+	else:
+		# map() returns results in sources order, whatever order they end in.
+		executor = ProcessPoolExecutor(max_workers=processes)
+		loaded = executor.map(worker, sources)
+
+	try:
+		# Merge each file as soon as it and every file before it are done.
+		for source, result in zip(sources, loaded):
+			if pricedict.lazy:
+				pricedict.add_ranges(source, result)
+				continue
+			for product_name, product in result.items():
+				pricedict.merge_product(product_name, *product)
+	finally:
+		if executor is not None:
+			executor.shutdown()
+
+	return pricedict
@@ -0,0 +1,210 @@
+"""
+price_dict_pool.py defines PriceDictPool, which hands out PriceDicts keyed by
+their base-prices source (a path or URL, as accepted by get_JSON) so that many
+storefronts can share a bounded amount of memory.
+
+PriceDicts are kept in least recently used order, and the oldest ones are
+dropped whenever the total size of the resident price arrays goes over the
+byte budget. A dropped PriceDict is rebuilt from its source on its next
+request. When several threads request the same missing source at once, only
+one of them builds it and the others wait for that build.
+
+PriceDicts handed out by the pool are shared between threads, so the pool
+only accepts eager PriceDicts: they are not changed by lookups, unlike lazy
+ones, which build and drop products as they are used.
+
+This file uses Google's Python style guide:
+https://google.github.io/styleguide/pyguide.html
+"""
+import threading
+
+from collections import OrderedDict
+
+from src import build_price_dict as BPD
+from src import get_json as GJ
+
+
+def load_price_dict(source):
+	"""
+	Default PriceDictPool loader: builds a PriceDict from a base-prices source.
+
+	Args:
+		source: Reference to a base-prices json file or URL.
+
+	Returns: A PriceDict holding the base prices of source.
+	"""
+	pricedict = BPD.PriceDict()
+	pricedict.add_base_price(GJ.get_JSON(source))
+	return pricedict
+
+
+def get_nbytes(pricedict):
+	"""
+	Gets the memory used by the price arrays of a PriceDict.
+
+	Args:
+		pricedict: The PriceDict to measure.
+
+	Returns: The total size of its price arrays, in bytes.
+	"""
+	return sum(array.nbytes for array in pricedict.price_array.values())
+
+
+class _Build:
+	"""
+	A PriceDict build in progress, shared by every thread waiting on it.
+	"""
+
+	def __init__(self):
+		self.done = threading.Event()
+		self.pricedict = None
+		self.error = None
+
+
+class PriceDictPool:
+	"""
+	Pool of PriceDicts keyed by source, bounded by the size of their arrays.
+
+	Attributes:
+		byte_budget: Maximum total size of the resident price arrays, in bytes.
+			The most recently requested PriceDict is always kept, even if it
+			is larger than the budget by itself.
+		loader: Callable taking a source and returning an eager PriceDict.
+		pool: OrderedDict of source: (PriceDict, size in bytes), least
+			recently used first.
+		nbytes: Total size of the resident price arrays, in bytes.
+		hits: Number of requests served from the pool.
+		misses: Number of requests that built a PriceDict.
+		shared: Number of requests that waited on another request's build.
+		evictions: Number of PriceDicts dropped to stay within the budget.
+	"""
+
+	def __init__(self, byte_budget, loader=load_price_dict):
+		"""
+		Initialize instance variables to default or empty values.
+
+		Args:
+			byte_budget: Maximum total size of resident price arrays, in bytes.
+			loader: Callable building an eager PriceDict from a source. 
+				Defaults to loading the source with get_JSON().
+		"""
+		self.byte_budget = byte_budget
+		self.loader = loader
+		self.pool = OrderedDict()
+		self.nbytes = 0
+		self.hits = 0
+		self.misses = 0
+		self.shared = 0
+		self.evictions = 0
+
+		self._lock = threading.Lock()
+		self._builds = {}
+
+
+	def get(self, source):
+		"""
+		Gets the PriceDict of a source, building it if it is not resident.
+
+		Args:
+			source: Reference to a base-prices json file or URL.
+
+		Returns: The PriceDict of source.
+
+		Raises:
+			Any error raised by the loader, in every thread waiting on the
+			failed build.
+			ValueError: If the loader returned a lazy PriceDict.
+		"""
+		with self._lock:
+			if source in self.pool:
+				self.pool.move_to_end(source)
+				self.hits += 1
+				return self.pool[source][0]
+
+			build = self._builds.get(source)
+			owner = build is None
+			if owner:
+				build = self._builds[source] = _Build()
+				self.misses += 1
+			else:
+				self.shared += 1
+
+		if not owner:
+			build.done.wait()
+			if build.error is not None:
+				raise build.error
+			return build.pricedict
+
+		try:
+			build.pricedict = self.loader(source)
+			if build.pricedict.lazy:
+				raise ValueError('PriceDictPool cannot share lazy PriceDicts.')
+		except BaseException as e:
+			build.error = e
+			raise
+		finally:
+			# Whatever the loader raised, waiting threads must be released.
+			with self._lock:
+				del self._builds[source]
+				if build.error is None:
+					self._add(source, build.pricedict)
+			build.done.set()
+
+		return build.pricedict
+
+
+	def _add(self, source, pricedict):
+		"""
+		Adds a PriceDict as most recently used, and evicts the least recently
+		used ones over the byte budget. Must be called holding the lock.
+		"""
+		nbytes = get_nbytes(pricedict)
+		self.pool[source] = (pricedict, nbytes)
+		self.nbytes += nbytes
+
+		while self.nbytes > self.byte_budget and len(self.pool) > 1:
+			_, (_, evicted_nbytes) = self.pool.popitem(last=False)
+			self.nbytes -= evicted_nbytes
+			self.evictions += 1
+
+
+	def discard(self, source):
+		"""
+		Drops the PriceDict of a source, if resident. Its next request
+		rebuilds it, for example after its base-prices have changed.
+
+		Args:
+			source: Reference to a base-prices json file or URL.
+		"""
+		with self._lock:
+			if source in self.pool:
+				self.nbytes -= self.pool.pop(source)[1]
+
+
+	def hit_rate(self):
+		"""
+		Gets the share of requests that did not have to build a PriceDict.
+
+		Returns: The hit rate, between 0 and 1 (0 before any request).
+		"""
+		requests = self.hits + self.misses + self.shared
+		if not requests:
+			return 0
+		return (self.hits + self.shared) / requests
+
+
+	def stats(self):
+		"""
+		Gets the pool metrics.
+
+		Returns: A dict of the pool's counters, hit rate and memory use.
+		"""
+		with self._lock:
+			return {'hits': self.hits,
+					'misses': self.misses,
+					'shared': self.shared,
+					'evictions': self.evictions,
+					'hit-rate': self.hit_rate(),
+					'resident': len(self.pool),
+					'nbytes': self.nbytes,
+					'byte-budget': self.byte_budget}
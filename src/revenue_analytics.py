@@ -0,0 +1,294 @@
+"""
+revenue_analytics.py computes revenue breakdowns over many historic carts at
+once. Instead of calling calculate_price.calculate() per cart, every line item
+is flattened into NumPy columns, base prices are resolved in bulk from a
+PriceDict with fancy indexing, and totals are grouped with np.unique and
+np.add.at.
+
+The revenue of a line item follows calculate_price.calculate():
+	(base_price + int(base_price * markup / 100)) * quantity
+
+This file uses Google's Python style guide:
+https://google.github.io/styleguide/pyguide.html
+"""
+import numpy as np
+
+# Constants used in JSON files.
+PTYPE = 'product-type'
+OPT = 'options'
+MKUP = 'artist-markup'
+QT = 'quantity'
+
+# Group keys that are not option categories.
+PRICE_LIST = 'price-list'
+MKUP_BAND = 'markup-band'
+
+"""
+Default markup band edges, in percent. Bands are [0, 10), [10, 20), ...
+and the last band is open-ended.
+"""
+DEFAULT_MARKUP_BANDS = (0, 10, 20, 30, 50, 100)
+
+
+def _fits_int64(value):
+	"""
+	Checks whether a Python int can be stored in an int64.
+	"""
+	return value <= np.iinfo(np.int64).max
+
+
+class LineItems:
+	"""
+	Column store of cart line items, with their base prices resolved.
+
+	Attributes:
+		columns: dict of numpy arrays of strings, one per group key
+			(product-type, price-list, and every option category seen in the
+			carts). Items without an option in a category hold ''.
+		base_price: numpy int64 array of the base price of each item, or an
+			object array of Python ints if a price does not fit in int64.
+		markup: numpy int64 array of the artist markup of each item.
+		quantity: numpy int64 array of the quantity of each item.
+	"""
+
+	def __init__(self, columns, base_price, markup, quantity):
+		"""
+		Initialize instance variables from already-built columns.
+		"""
+		self.columns = columns
+		self.base_price = base_price
+		self.markup = markup
+		self.quantity = quantity
+
+
+	def __len__(self):
+		return len(self.base_price)
+
+
+	def revenue(self):
+		"""
+		Computes the revenue of every line item, as calculate() would.
+
+		Falls back to Python ints (an object array) when int64 could 
+		overflow, judging from the largest base price, markup and quantity.
+
+		Returns: numpy array of the price of each item.
+		"""
+		base_price = self.base_price
+		if len(self) and not _fits_int64(
+				int(base_price.max()) * (100 + max(int(self.markup.max()), 0))
+				* int(self.quantity.max())):
+			base_price = base_price.astype(object)
+
+		item_markup = (base_price * self.markup) // 100
+		return (base_price + item_markup) * self.quantity
+
+
+	def markup_bands(self, edges=DEFAULT_MARKUP_BANDS):
+		"""
+		Labels each line item with the markup band it falls into.
+
+		Args:
+			edges: Sorted lower bounds of each band, in percent.
+
+		Returns: numpy array of band labels, such as '10-20' or '100+'.
+		"""
+		labels = ['%d-%d' % (low, high) for low, high in zip(edges, edges[1:])]
+		labels.append('%d+' % edges[-1])
+		# Markups below the first edge are placed in the first band.
+		bands = np.maximum(np.digitize(self.markup, edges) - 1, 0)
+		return np.array(labels)[bands]
+
+
+	@staticmethod
+	def concatenate(line_items_list):
+		"""
+		Joins several LineItems (for example, one per price list) into one.
+
+		Args:
+			line_items_list: A list of LineItems.
+
+		Returns: A single LineItems holding every item, in order.
+		"""
+		names = set()
+		for line_items in line_items_list:
+			names.update(line_items.columns)
+
+		columns = {}
+		for name in names:
+			columns[name] = np.concatenate([
+				line_items.columns.get(name, np.full(len(line_items), ''))
+				for line_items in line_items_list])
+
+		return LineItems(
+			columns,
+			np.concatenate([l.base_price for l in line_items_list]),
+			np.concatenate([l.markup for l in line_items_list]),
+			np.concatenate([l.quantity for l in line_items_list]))
+
+
+def resolve_base_prices(products, columns, pricedict):
+	"""
+	Looks up the base price of every line item with one fancy-indexing call
+	per product-type.
+
+	Option names are mapped to array indices once per unique name (through
+	np.unique's inverse), rather than once per item. Items with an unlisted
+	option, or landing on an unset cell of a product with wildcard rules, are
+	looked up again through get_price(), once per distinct option 
+	combination.
+
+	Args:
+		products: numpy array of the product-type of each item.
+		columns: dict of numpy arrays of option names, per option category.
+		pricedict: A PriceDict holding the base prices of the items.
+
+	Returns: numpy int64 array of base prices, or an object array of Python
+		ints if a price (from an array or a rule) is too large for int64.
+
+	Raises:
+		KeyError: If an item has an option no entry or rule prices, as with
+			calculate_price.calculate().
+	"""
+	# Prices are gathered per product, as the dtype of the result is only
+	# known once every product's prices are.
+	results = []
+	for product in np.unique(products):
+		rows = np.nonzero(products == product)[0]
+		pricedict.load_product(product)
+		product_info = pricedict.lookup_dict[product]
+
+		# Options not listed by any entry (or left out by the item) are -1.
+		lookup_indices = ()
+		for option_category in product_info.option_order.values():
+			option_dict = product_info.option_dict[option_category]
+			column = columns.get(option_category, np.full(len(products), ''))
+			names, inverse = np.unique(column[rows], return_inverse=True)
+			name_indices = np.array([option_dict.get(name, -1)
+									for name in names], dtype=np.intp)
+			lookup_indices += (name_indices[inverse].reshape(-1), )
+
+		unlisted = np.zeros(len(rows), dtype=bool)
+		for indices in lookup_indices:
+			unlisted |= indices < 0
+		dense_indices = tuple(np.maximum(indices, 0)
+							for indices in lookup_indices)
+		prices = pricedict.price_array[product][dense_indices]
+		prices = np.where(unlisted, 0, prices).reshape(-1)
+
+		# Unlisted options, and unset cells of products with rules, go 
+		# through get_price(), which raises KeyError if no rule matches.
+		fallback = unlisted
+		if product_info.rules:
+			fallback = unlisted | (prices == 0)
+		resolved = []
+		if fallback.any():
+			# Look up each distinct option combination once.
+			stacked = np.stack(lookup_indices, axis=1) if lookup_indices else (
+				np.zeros((len(rows), 0), dtype=np.intp))
+			combinations, inverse = np.unique(stacked[fallback], axis=0,
+												return_inverse=True)
+			resolved = [pricedict.get_price(product, tuple(
+							int(index) if index >= 0 else None
+							for index in combination))
+						for combination in combinations]
+
+		# Rule prices are Python ints, and may not fit in int64 either.
+		max_price = max([int(prices.max()) if prices.size else 0] + resolved)
+		dtype = np.int64 if _fits_int64(max_price) else object
+		prices = prices.astype(dtype)
+		if resolved:
+			prices[fallback] = np.array(resolved, dtype=dtype)[
+				inverse.reshape(-1)]
+		results.append((rows, prices))
+
+	dtype = np.int64
+	if any(prices.dtype == object for _, prices in results):
+		dtype = object
+	base_price = np.zeros(len(products), dtype=dtype)
+	for rows, prices in results:
+		base_price[rows] = prices
+
+	return base_price
+
+
+def load_line_items(cartjsons, pricedict, price_list=''):
+	"""
+	Flattens carts into a LineItems, resolving each item's base price.
+
+	Args:
+		cartjsons: An iterable of cart JSON objects.
+		pricedict: The PriceDict the carts were priced with.
+		price_list: Name of the price list, kept in the price-list column so
+			LineItems from several price lists can be concatenated.
+
+	Returns: A LineItems of every item in the carts.
+	"""
+	items = [item for cartjson in cartjsons for item in cartjson]
+
+	option_categories = set()
+	for item in items:
+		option_categories.update(item[OPT])
+
+	columns = {PTYPE: np.array([item[PTYPE] for item in items], dtype=str),
+				PRICE_LIST: np.full(len(items), price_list)}
+	for option_category in option_categories:
+		columns[option_category] = np.array(
+			[item[OPT].get(option_category, '') for item in items], dtype=str)
+
+	markup = np.array([item[MKUP] for item in items], dtype=np.int64)
+	quantity = np.array([item[QT] for item in items], dtype=np.int64)
+	base_price = resolve_base_prices(columns[PTYPE], columns, pricedict)
+
+	return LineItems(columns, base_price, markup, quantity)
+
+
+def group_revenue(line_items, group_by, markup_bands=DEFAULT_MARKUP_BANDS):
+	"""
+	Totals revenue per group of line items.
+
+	Args:
+		line_items: A LineItems, from load_line_items().
+		group_by: A list of group keys: product-type, price-list, markup-band
+			or any option category.
+		markup_bands: Band edges used when grouping by markup-band.
+
+	Returns: A dict mapping a tuple of group values (in group_by order) to the
+		total revenue of the group, as an int. An empty group_by returns the
+		grand total under the key ().
+	"""
+	revenue = line_items.revenue()
+	if not len(line_items):
+		return {}
+
+	# Encode every group key as integer codes, then group identical rows.
+	uniques = []
+	codes = []
+	for key in group_by:
+		if key == MKUP_BAND:
+			column = line_items.markup_bands(markup_bands)
+		else:
+			column = line_items.columns.get(key, np.full(len(line_items), ''))
+		values, inverse = np.unique(column, return_inverse=True)
+		uniques.append(values)
+		codes.append(inverse.reshape(-1))
+
+	# Unique rows of codes, rather than raveled codes, which could overflow
+	# intp when grouping by many keys.
+	stacked = np.stack(codes, axis=1) if codes else (
+		np.zeros((len(line_items), 0), dtype=np.intp))
+	groups, inverse = np.unique(stacked, axis=0, return_inverse=True)
+
+	# Sum as Python ints if the total of all items could overflow int64.
+	dtype = revenue.dtype
+	if not _fits_int64(int(revenue.max()) * len(revenue)):
+		dtype = object
+	totals = np.zeros(len(groups), dtype=dtype)
+	np.add.at(totals, inverse.reshape(-1), revenue.astype(dtype))
+
+	result = {}
+	for group, total in zip(groups, totals):
+		key = tuple(str(uniques[dimension][code])
+					for dimension, code in enumerate(group))
+		result[key] = int(total)
+	return result
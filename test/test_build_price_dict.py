@@ -10,6 +10,7 @@ In the event PriceDict's get_* methods fail, this test script will attempt
 to exit with code 1, as the integrity of all other tests cannot be guaranteed.
 """
 
+import itertools
 import sys
 import unittest
 import numpy as np
@@ -163,6 +164,246 @@ class TestBuildPriceDict(unittest.TestCase):
 			sys.exit("A critical test for BPD.get_price() has failed.")
 
 
+	"""
+	Test wildcard rules: entries leaving out an option category are kept as
+	rules instead of being written into the price_array.
+	"""
+
+	def test_wildcard_rules(self):
+		# Adding print-location turns the existing hoodie entries into rules 
+		# matching any print-location.
+		self.pricejson += [
+			{'product-type': 'hoodie', 'options': {'print-location': ['front'],
+				'colour': ['white', 'dark'], 'size': ['small']},
+				'base-price': 3900},
+			{'product-type': 'hoodie', 'options': {'print-location': ['back']},
+				'base-price': 4000},
+			{'product-type': 'hoodie', 'options': {'size': ['xl'],
+				'print-location': ['back']}, 'base-price': 4500}]
+		pricedict = BPD.PriceDict()
+		pricedict.add_base_price(self.pricejson)
+		hoodie = pricedict.lookup_dict['hoodie']
+
+		# Seven rules, the latest of the most specific ones first
+		self.assertEqual(len(hoodie.rules), 7)
+		self.assertEqual(hoodie.rules[0][1], 4500)
+		self.assertEqual(hoodie.rules[-1][1], 4000)
+
+		white = pricedict.get_index('hoodie', 'colour', 'white')
+		small = pricedict.get_index('hoodie', 'size', 'small')
+		xl = pricedict.get_index('hoodie', 'size', 'xl')
+		front = pricedict.get_index('hoodie', 'print-location', 'front')
+		back = pricedict.get_index('hoodie', 'print-location', 'back')
+
+		# Full entries beat rules, and more specific rules beat less specific
+		self.assertEqual(pricedict.get_price('hoodie', (white, small, front)),
+						3900)
+		self.assertEqual(pricedict.get_price('hoodie', (white, small, back)),
+						3800)
+		self.assertEqual(pricedict.get_price('hoodie', (white, xl, back)), 4500)
+		self.assertEqual(pricedict.get_price('hoodie', (white, xl, front)),
+						4108)
+		# Unlisted colours only match rules leaving colour out
+		self.assertEqual(pricedict.get_price('hoodie', (None, small, back)),
+						4000)
+		self.assertRaises(KeyError,
+			lambda: pricedict.get_price('hoodie', (None, xl, front)))
+
+	def test_wildcard_rule_precedence(self):
+		# On equally specific rules, the later entry wins
+		self.pricejson += [
+			{'product-type': 'leggings', 'options': {'size': ['small']},
+				'base-price': 5500},
+			{'product-type': 'leggings', 'options': {}, 'base-price': 6000}]
+		pricedict = BPD.PriceDict()
+		pricedict.add_base_price(self.pricejson)
+		small = pricedict.get_index('leggings', 'size', 'small')
+		self.assertEqual(pricedict.get_price('leggings', (small,)), 5500)
+		self.assertEqual(pricedict.get_price('leggings', (None,)), 6000)
+
+	def test_rule_index(self):
+		# Equally specific rules on different categories: the later one wins
+		pricejson = [
+			{'product-type': 'tee', 'options': {'colour': ['dark'],
+				'size': ['m']}, 'base-price': 1000},
+			{'product-type': 'tee', 'options': {'colour': ['white']},
+				'base-price': 100},
+			{'product-type': 'tee', 'options': {'size': ['s']},
+				'base-price': 200}]
+		pricedict = BPD.PriceDict()
+		pricedict.add_base_price(pricejson)
+		tee = pricedict.lookup_dict['tee']
+		self.assertEqual(len(tee.rule_index), 1)
+		self.assertEqual(len(tee.rule_index[0]), 2)
+
+		white = pricedict.get_index('tee', 'colour', 'white')
+		dark = pricedict.get_index('tee', 'colour', 'dark')
+		s = pricedict.get_index('tee', 'size', 's')
+		m = pricedict.get_index('tee', 'size', 'm')
+		self.assertEqual(pricedict.get_price('tee', (dark, m)), 1000)
+		self.assertEqual(pricedict.get_price('tee', (white, s)), 200)
+		self.assertEqual(pricedict.get_price('tee', (white, m)), 100)
+		self.assertEqual(pricedict.get_price('tee', (None, s)), 200)
+		self.assertRaises(KeyError,
+			lambda: pricedict.get_price('tee', (None, m)))
+
+	def test_explicit_zero(self):
+		# A cell set to 0 by an entry beats a rule, in both modes
+		pricejson = [
+			{'product-type': 'leggings', 'options': {'size': ['small']},
+				'base-price': 0},
+			{'product-type': 'leggings', 'options': {}, 'base-price': 6000}]
+		for pricedict in (BPD.PriceDict(), BPD.PriceDict(lazy=True)):
+			pricedict.add_base_price(pricejson)
+			small = pricedict.get_index('leggings', 'size', 'small')
+			self.assertEqual(pricedict.get_price('leggings', (small,)), 0)
+			self.assertEqual(pricedict.get_price('leggings', (None,)), 6000)
+
+
+	"""
+	Test lazy mode: products are only built on lookup, and the least recently
+	used ones are dropped beyond max_products.
+	"""
+
+	def test_lazy_build(self):
+		# Nothing is built at load, only the looked up product afterwards
+		pricedict = BPD.PriceDict(lazy=True)
+		pricedict.add_base_price(self.pricejson)
+		self.assertEqual(len(pricedict.price_array), 0)
+		self.assertEqual(len(pricedict.products()), 4)
+
+		self.assertEqual(pricedict.get_price('hoodie', (0,0)), 3800)
+		self.assertEqual(list(pricedict.price_array), ['hoodie'])
+		self.assertEqual(pricedict.price_array['hoodie'].shape,
+						self.pricedict.price_array['hoodie'].shape)
+
+	def test_lazy_file(self):
+		# Only byte ranges of the file are kept, and read back on lookup
+		pricedict = BPD.PriceDict(lazy=True)
+		pricedict.add_base_price_file('ref/base-prices/base-prices.json')
+		self.assertEqual(pricedict.sources,
+						['ref/base-prices/base-prices.json'])
+		# Consecutive hoodie entries are a single range
+		self.assertEqual(len(pricedict.ranges['hoodie']), 1)
+		self.assertEqual(len(pricedict.read_entries('hoodie')), 5)
+
+		self.assertEqual(pricedict.get_price('hoodie', (0,0)), 3800)
+		self.assertEqual(pricedict.get_price('leggings', ()), 5000)
+		self.assertEqual(sorted(pricedict.price_array), ['hoodie', 'leggings'])
+
+	def test_lazy_lru(self):
+		# Only the two most recently used products stay built
+		pricedict = BPD.PriceDict(lazy=True, max_products=2)
+		pricedict.add_base_price(self.pricejson)
+		pricedict.get_price('hoodie', (0,0))
+		pricedict.get_price('sticker', (0,))
+		pricedict.get_price('hoodie', (0,0))
+		self.assertEqual(pricedict.get_price('leggings', ()), 5000)
+		self.assertEqual(sorted(pricedict.price_array), ['hoodie', 'leggings'])
+
+		# Dropped products are rebuilt on their next lookup
+		self.assertEqual(pricedict.get_index('sticker', 'size', 'xl'), 3)
+		self.assertEqual(sorted(pricedict.price_array), ['leggings', 'sticker'])
+
+		# At least the product being looked up must stay built
+		self.assertRaises(ValueError,
+			lambda: BPD.PriceDict(lazy=True, max_products=0))
+
+	def test_add_second_base_price(self):
+		# Prices of an earlier base-prices JSON are kept
+		self.pricedict.add_base_price([{'product-type': 'sticker',
+			'options': {'size': ['xxl']}, 'base-price': 2000}])
+		xxl = self.pricedict.get_index('sticker', 'size', 'xxl')
+		self.assertEqual(self.pricedict.get_price('sticker', (xxl,)), 2000)
+		self.assertEqual(self.pricedict.get_price('sticker', (0,)), 221)
+		self.assertEqual(self.pricedict.get_price('hoodie', (0,0)), 3800)
+
+	def test_add_option_category(self):
+		# A later option category turns earlier cells into rules, as a single
+		# build of every entry would
+		later = [{'product-type': 'hoodie', 'options': {
+					'print-location': ['back'], 'colour': ['dark'],
+					'size': ['small']}, 'base-price': 4000},
+				{'product-type': 'hoodie', 'options': {'print-location': 
+					['front']}, 'base-price': 0}]
+		self.pricedict.add_base_price(later)
+		product_info, price_array, _, _ = BPD.build_product(
+			[product for product in self.pricejson + later
+				if product['product-type'] == 'hoodie'])
+
+		hoodie = self.pricedict.lookup_dict['hoodie']
+		self.assertEqual(dict(hoodie.option_dict),
+						dict(product_info.option_dict))
+		self.assertTrue(np.array_equal(self.pricedict.price_array['hoodie'],
+										price_array))
+		# Earlier entries become one rule each, matching the same prices
+		self.assertEqual(len(hoodie.rules), len(product_info.rules))
+		for option_tuple in itertools.product(
+				*[list(range(size)) + [None] for size in price_array.shape]):
+			self.assertEqual(hoodie.match_rule(option_tuple),
+							product_info.match_rule(option_tuple))
+
+	def test_left_out_option_category(self):
+		# Later entries leaving out a category are one rule each, not one per
+		# cell of their cross-product
+		colours = ['colour-%d' % index for index in range(100)]
+		sizes = ['size-%d' % index for index in range(50)]
+		first = [{'product-type': 'tee', 'options': {'colour': colours,
+					'size': sizes, 'print-location': ['front']},
+					'base-price': 1000}]
+		second = [{'product-type': 'tee', 'options': {'colour': colours,
+					'size': sizes}, 'base-price': 1200}]
+		pricedict = BPD.PriceDict()
+		pricedict.add_base_price(first)
+		pricedict.add_base_price(second)
+		product_info, _, _, _ = BPD.build_product(first + second)
+		self.assertEqual(len(pricedict.lookup_dict['tee'].rules),
+						len(product_info.rules))
+
+		# And in the other order, the earlier entries become rules
+		pricedict = BPD.PriceDict()
+		pricedict.add_base_price(second)
+		pricedict.add_base_price(first)
+		product_info, _, _, _ = BPD.build_product(second + first)
+		self.assertEqual(len(pricedict.lookup_dict['tee'].rules),
+						len(product_info.rules))
+		self.assertEqual(pricedict.get_price('tee', (0, 0, 0)), 1000)
+		self.assertEqual(pricedict.get_price('tee', (0, 0, None)), 1200)
+
+
+	"""
+	Test dtype selection and the memory report.
+	"""
+
+	def test_dtype(self):
+		# Reference prices fit in uint16, larger ones widen the array
+		self.assertEqual(self.pricedict.price_array['hoodie'].dtype, np.uint16)
+		self.pricedict.add_base_price([
+			{'product-type': 'cases', 'options': {'colour': ['blue']},
+				'base-price': 70000},
+			{'product-type': 'leggings', 'options': {},
+				'base-price': 2 ** 40}])
+		self.assertEqual(self.pricedict.price_array['cases'].dtype, np.uint32)
+		self.assertEqual(self.pricedict.price_array['leggings'].dtype,
+						np.uint64)
+		self.assertEqual(self.pricedict.get_price('leggings', ()), 2 ** 40)
+		self.assertRaises(ValueError, lambda: BPD.get_dtype(2 ** 64))
+
+	def test_memory_report(self):
+		# Hoodie has 12 cells of 2 bytes, all of them priced
+		report = self.pricedict.memory_report()
+		self.assertEqual(sorted(report), ['cases', 'hoodie', 'leggings',
+											'sticker'])
+		self.assertEqual(report['hoodie'], {'nbytes': 24, 'fill-ratio': 1.0,
+											'dtype': 'uint16'})
+
+		# Cells set to a price of 0 are filled
+		self.pricedict.add_base_price([{'product-type': 'sticker',
+			'options': {'size': ['xxl']}, 'base-price': 0}])
+		report = self.pricedict.memory_report()
+		self.assertEqual(report['sticker']['fill-ratio'], 1.0)
+
+
 # Allow this script to be run directly as a module
 if __name__ == '__main__':
 	unittest.main()
\ No newline at end of file
@@ -65,6 +65,40 @@ class TestCalculatePrice(unittest.TestCase):
 		# Assert on a cart with no item
 		self.assertEqual(CALC.calculate(self.cart_5500, self.pricedict), 5500)
 
+	def test_wildcard_rule(self):
+		# A sticker entry with no options prices any unlisted size
+		pricejson = GJ.get_JSON('ref/base-prices/base-prices.json')
+		pricejson.append({'product-type': 'sticker', 'options': {},
+							'base-price': 300})
+		pricedict = BPD.PriceDict()
+		pricedict.add_base_price(pricejson)
+		cart = [{'product-type': 'sticker', 'options': {'size': 'tiny'},
+					'artist-markup': 10, 'quantity': 2}]
+		self.assertEqual(CALC.calculate(cart, pricedict), 660)
+		self.assertEqual(CALC.calculate(self.cart_9363, pricedict), 9363)
+
+	def test_lazy_pricedict(self):
+		# A lazy PriceDict, even with a single resident product, prices alike
+		pricedict = BPD.PriceDict(lazy=True, max_products=1)
+		pricedict.add_base_price(
+			GJ.get_JSON('ref/base-prices/base-prices.json'))
+		self.assertEqual(CALC.calculate(self.cart_9363, pricedict), 9363)
+		self.assertEqual(CALC.calculate(self.cart_5500, pricedict), 5500)
+		self.assertEqual(list(pricedict.price_array), ['leggings'])
+
+	def test_large_totals(self):
+		# Prices stored as uint16 do not overflow on large quantities
+		cart = [{'product-type': 'leggings', 'options': {},
+					'artist-markup': 10, 'quantity': 10 ** 6}]
+		self.assertEqual(CALC.calculate(cart, self.pricedict), 5500 * 10 ** 6)
+
+		# Nor do they lose precision beyond float range
+		self.pricedict.add_base_price([{'product-type': 'leggings',
+			'options': {}, 'base-price': 2 ** 63 + 1}])
+		cart[0]['quantity'] = 1
+		self.assertEqual(CALC.calculate(cart, self.pricedict),
+						2 ** 63 + 1 + (2 ** 63 + 1) // 10)
+
 
 # Allow this module to be run directly
 if __name__ == "__main__":
@@ -0,0 +1,98 @@
+"""
+Unit test case for src/diff_price_dict.py.
+
+Diffs the reference base-prices against modified copies of itself, and checks
+that the CartIndex only reports carts touching the changed cells.
+"""
+
+import copy
+import unittest
+
+from src import diff_price_dict as DIFF
+from src import build_price_dict as BPD
+from src import get_json as GJ
+
+class TestDiffPriceDict(unittest.TestCase):
+	"""
+	TestCase class for src/diff_price_dict.py for easy test case running.
+
+	Tests unchanged, changed, added, and removed prices, as well as option
+	order changes that reassign array indices without changing any price.
+	"""
+
+	def setUp(self):
+		self.pricejson = GJ.get_JSON('ref/base-prices/base-prices.json')
+		self.pricedict = BPD.PriceDict()
+		self.pricedict.add_base_price(self.pricejson)
+
+		self.cart_9500 = GJ.get_JSON('ref/cart/cart-9500.json')
+		self.cart_9363 = GJ.get_JSON('ref/cart/cart-9363.json')
+		self.cart_5500 = GJ.get_JSON('ref/cart/cart-5500.json')
+
+		self.cartindex = DIFF.CartIndex()
+		self.cartindex.add_cart(9500, self.cart_9500, self.pricedict)
+		self.cartindex.add_cart(9363, self.cart_9363, self.pricedict)
+		self.cartindex.add_cart(5500, self.cart_5500, self.pricedict)
+
+	def test_no_change(self):
+		# Diffing identical base-prices reports nothing
+		self.assertEqual(DIFF.diff_base_prices(self.pricejson, self.pricejson),
+						{})
+
+	def test_reordered_options(self):
+		# Swapping option order changes array indices, but not prices
+		newjson = copy.deepcopy(self.pricejson)
+		newjson[0]['options']['size'].reverse()
+		newjson.insert(0, newjson.pop(3))
+		self.assertEqual(DIFF.diff_base_prices(self.pricejson, newjson), {})
+
+	def test_changed_price(self):
+		# Hoodie dark/small and dark/medium share an entry with white ones
+		newjson = copy.deepcopy(self.pricejson)
+		newjson.append({'product-type': 'hoodie',
+						'options': {'colour': ['dark'],
+									'size': ['small', 'medium']},
+						'base-price': 3900})
+		changes = DIFF.diff_base_prices(self.pricejson, newjson)
+		self.assertEqual(changes,
+						{'hoodie': {('dark', 'small'), ('dark', 'medium')}})
+		self.assertEqual(self.cartindex.affected_carts(changes), {9500, 9363})
+
+	def test_new_option(self):
+		# A new option is a changed cell, even for a product with no carts
+		newjson = copy.deepcopy(self.pricejson)
+		newjson.append({'product-type': 'sticker',
+						'options': {'size': ['xxl']},
+						'base-price': 2000})
+		changes = DIFF.diff_base_prices(self.pricejson, newjson)
+		self.assertEqual(changes, {'sticker': {('xxl',)}})
+		self.assertEqual(self.cartindex.affected_carts(changes), set())
+
+	def test_changed_rule(self):
+		# Wildcard rules may price any cell of their product
+		newjson = copy.deepcopy(self.pricejson)
+		newjson.append({'product-type': 'sticker', 'options': {},
+						'base-price': 300})
+		changes = DIFF.diff_base_prices(self.pricejson, newjson)
+		self.assertEqual(changes, {'sticker': DIFF.ALL_CELLS})
+		self.assertEqual(self.cartindex.affected_carts(changes), {9363})
+
+	def test_removed_products(self):
+		# base-prices-hoodie only keeps the hoodie entries
+		newjson = GJ.get_JSON('ref/base-prices/base-prices-hoodie.json')
+		changes = DIFF.diff_base_prices(self.pricejson, newjson)
+		self.assertEqual(changes, {'sticker': DIFF.ALL_CELLS,
+								'leggings': DIFF.ALL_CELLS,
+								'cases': DIFF.ALL_CELLS})
+		self.assertEqual(self.cartindex.affected_carts(changes), {9363, 5500})
+
+	def test_remove_cart(self):
+		# Removed carts are no longer reported
+		self.cartindex.remove_cart(9363)
+		changes = {'hoodie': DIFF.ALL_CELLS, 'sticker': DIFF.ALL_CELLS}
+		self.assertEqual(self.cartindex.affected_carts(changes), {9500})
+
+
+# Allow this module to be run directly
+if __name__ == "__main__":
+	unittest.main()
@@ -4,6 +4,7 @@ Unit test case for src/get_json.py.
 Tests positive and negative inputs for both local files and URL-based loading.
 """
 
+import tempfile
 import unittest
 from src import get_json as GJ
 
@@ -31,6 +32,30 @@ class TestGetJson(unittest.TestCase):
 		# Test a local file that ISN'T a JSON file
 		self.assertRaises(ValueError, lambda: GJ.get_JSON('main.py'))
 
+	def test_scan_local_json(self):
+		# Scanned byte ranges read back the same elements
+		elements = GJ.get_JSON('ref/base-prices/base-prices.json')
+		ranges = list(GJ.scan_JSON('ref/base-prices/base-prices.json'))
+		self.assertEqual([element for element, _, _ in ranges], elements)
+		self.assertEqual(
+			GJ.read_JSON_range('ref/base-prices/base-prices.json',
+								ranges[1][1], ranges[3][2]),
+			elements[1:4])
+
+	def test_scan_local_not_json(self):
+		# Scanning a file that ISN'T a JSON array
+		self.assertRaises(ValueError, lambda: list(GJ.scan_JSON('main.py')))
+
+	def test_scan_malformed_array(self):
+		# Scanning rejects the same arrays get_JSON() does
+		for text in ('[{"a": 1} {"b": 2}]', '[1, 2,]', '[1, 2] 3', '[1, 2'):
+			with tempfile.NamedTemporaryFile('w', suffix='.json') as file:
+				file.write(text)
+				file.flush()
+				self.assertRaises(ValueError, lambda: GJ.get_JSON(file.name))
+				self.assertRaises(ValueError,
+					lambda: list(GJ.scan_JSON(file.name)))
+
 
 	# URL-based tests
 
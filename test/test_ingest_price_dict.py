@@ -0,0 +1,102 @@
+"""
+Unit test case for src/ingest_price_dict.py.
+
+Affirms that ingesting several base-prices files gives the same PriceDict as
+adding them one after the other.
+"""
+
+import unittest
+import numpy as np
+
+from src import ingest_price_dict as INGEST
+from src import build_price_dict as BPD
+from src import get_json as GJ
+
+SOURCES = ['ref/base-prices/base-prices-hoodie.json',
+			'ref/base-prices/base-prices.json',
+			'ref/base-prices/base-prices-hoodie.json']
+
+class TestIngestPriceDict(unittest.TestCase):
+	"""
+	TestCase class for src/ingest_price_dict.py for easy test case running.
+
+	Compares option indices and price arrays against a sequential load, with
+	and without worker processes.
+	"""
+
+	def setUp(self):
+		self.sources = SOURCES
+		self.pricedict = BPD.PriceDict()
+		for source in self.sources:
+			self.pricedict.add_base_price(GJ.get_JSON(source))
+
+	def assertSamePriceDict(self, pricedict):
+		# Same products, option indices, option order and prices
+		self.assertEqual(sorted(pricedict.price_array),
+						sorted(self.pricedict.price_array))
+		for product, product_info in self.pricedict.lookup_dict.items():
+			self.assertEqual(dict(pricedict.lookup_dict[product].option_dict),
+							dict(product_info.option_dict))
+			self.assertEqual(pricedict.lookup_dict[product].option_order,
+							product_info.option_order)
+			self.assertTrue(np.array_equal(pricedict.price_array[product],
+							self.pricedict.price_array[product]))
+
+	def test_ingest_in_process(self):
+		# A single process loads every file in turn
+		self.assertSamePriceDict(INGEST.ingest(self.sources, processes=1))
+
+	def test_ingest_workers(self):
+		# Worker processes are merged back in file order
+		self.assertSamePriceDict(INGEST.ingest(self.sources, processes=2))
+
+	def test_ingest_lazy(self):
+		# A lazy PriceDict builds the same products on lookup
+		pricedict = INGEST.ingest(self.sources, BPD.PriceDict(lazy=True),
+									processes=2)
+		self.assertEqual(len(pricedict.price_array), 0)
+		self.assertEqual(pricedict.sources, self.sources)
+		for product in pricedict.products():
+			pricedict.load_product(product)
+		self.assertSamePriceDict(pricedict)
+
+	def test_build_source(self):
+		# Workers only send back built products, not the parsed entries
+		result = INGEST.build_source(self.sources[1])
+		self.assertEqual(list(result), ['hoodie', 'sticker', 'leggings',
+										'cases'])
+		product_info, price_array, price_set, entry_rules = result['hoodie']
+		self.assertIsInstance(product_info, BPD.ProductInfo)
+		self.assertEqual(price_array.shape, (2, 6))
+		self.assertTrue(price_set.all())
+		self.assertEqual(len(entry_rules), 5)
+
+	def test_merge(self):
+		# Merging gives the indices of populating every entry in order
+		first = [{'product-type': 'hoodie', 'options': {'size': ['small'],
+			'colour': ['dark']}, 'base-price': 1}]
+		second = [{'product-type': 'hoodie', 'options': {
+			'print-location': ['back'], 'colour': ['white', 'dark'],
+			'size': ['large']}, 'base-price': 2}]
+
+		populated = BPD.ProductInfo()
+		for product in first + second:
+			populated.populate(product)
+		merged = BPD.ProductInfo()
+		for pricejson in (first, second):
+			product_info = BPD.ProductInfo()
+			product_info.populate(pricejson[0])
+			merged.merge(product_info)
+
+		self.assertEqual(dict(merged.option_dict), dict(populated.option_dict))
+		self.assertEqual(merged.option_order, populated.option_order)
+
+	def test_ingest_bad_source(self):
+		# Loading errors from workers are raised
+		self.assertRaises(ValueError,
+			lambda: INGEST.ingest(['nonexistent_path'], processes=2))
+
+
+# Allow this module to be run directly
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,119 @@
+"""
+Unit test case for src/price_dict_pool.py.
+
+Tests hits and misses, eviction against the byte budget, and a single shared
+build for concurrent requests of the same source.
+"""
+
+import threading
+import time
+import unittest
+
+from src import price_dict_pool as POOL
+from src import build_price_dict as BPD
+
+FULL = 'ref/base-prices/base-prices.json'
+HOODIE = 'ref/base-prices/base-prices-hoodie.json'
+
+class TestPriceDictPool(unittest.TestCase):
+	"""
+	TestCase class for src/price_dict_pool.py for easy test case running.
+
+	The full base-prices arrays take 36 bytes, the hoodie-only ones 24 bytes.
+	"""
+
+	def setUp(self):
+		self.loads = []
+
+		def loader(source):
+			self.loads.append(source)
+			return POOL.load_price_dict(source)
+
+		self.pool = POOL.PriceDictPool(50, loader)
+
+	def test_hit(self):
+		# The second request is served from the pool
+		pricedict = self.pool.get(FULL)
+		self.assertIs(self.pool.get(FULL), pricedict)
+		self.assertEqual(self.loads, [FULL])
+		self.assertEqual(self.pool.nbytes, 36)
+		self.assertEqual(self.pool.hit_rate(), 0.5)
+
+	def test_eviction(self):
+		# Both sources do not fit: the least recently used one is dropped
+		self.pool.get(FULL)
+		self.pool.get(HOODIE)
+		self.assertEqual(list(self.pool.pool), [HOODIE])
+		self.assertEqual(self.pool.nbytes, 24)
+
+		# And reloaded on its next request
+		self.pool.get(FULL)
+		self.assertEqual(self.loads, [FULL, HOODIE, FULL])
+		stats = self.pool.stats()
+		self.assertEqual(stats['evictions'], 2)
+		self.assertEqual(stats['misses'], 3)
+		self.assertEqual(stats['hits'], 0)
+
+	def test_shared_build(self):
+		# Concurrent requests of a missing source share a single build
+		started = threading.Event()
+		release = threading.Event()
+
+		def held_loader(source):
+			started.set()
+			release.wait()
+			return POOL.load_price_dict(source)
+
+		pool = POOL.PriceDictPool(100, held_loader)
+		results = []
+		threads = [threading.Thread(target=lambda: results.append(
+			pool.get(FULL))) for _ in range(4)]
+		threads[0].start()
+		started.wait()
+		for thread in threads[1:]:
+			thread.start()
+
+		# Release the build once every other request waits on it
+		while pool.stats()['shared'] < 3:
+			time.sleep(0.001)
+		release.set()
+		for thread in threads:
+			thread.join()
+
+		self.assertEqual(len(results), 4)
+		self.assertTrue(all(result is results[0] for result in results))
+		self.assertEqual(pool.misses, 1)
+		self.assertEqual(pool.shared, 3)
+
+	def test_lazy_loader(self):
+		# Lazy PriceDicts are not thread-safe, and are refused
+		def lazy_loader(source):
+			pricedict = BPD.PriceDict(lazy=True)
+			pricedict.add_base_price_file(source)
+			return pricedict
+
+		pool = POOL.PriceDictPool(100, lazy_loader)
+		self.assertRaises(ValueError, lambda: pool.get(FULL))
+		self.assertEqual(len(pool.pool), 0)
+
+	def test_failed_build(self):
+		# A failed build raises, and is retried on the next request
+		self.assertRaises(ValueError, lambda: self.pool.get('nonexistent_path'))
+		self.assertRaises(ValueError, lambda: self.pool.get('nonexistent_path'))
+		self.assertEqual(len(self.pool.pool), 0)
+
+	def test_interrupted_build(self):
+		# A build interrupted by a BaseException does not block later requests
+		def interrupted_loader(source):
+			pool.loader = POOL.load_price_dict
+			raise KeyboardInterrupt
+
+		pool = POOL.PriceDictPool(100, interrupted_loader)
+		self.assertRaises(KeyboardInterrupt, lambda: pool.get(FULL))
+		self.assertEqual(pool._builds, {})
+		self.assertEqual(POOL.get_nbytes(pool.get(FULL)), 36)
+
+
+# Allow this module to be run directly
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,169 @@
+"""
+Unit test case for src/revenue_analytics.py.
+
+Checks that bulk-resolved revenue agrees with calculate_price.calculate() on
+the reference carts, and that grouping splits it as expected.
+"""
+
+import unittest
+
+from src import revenue_analytics as RA
+from src import calculate_price as CALC
+from src import build_price_dict as BPD
+from src import get_json as GJ
+
+class TestRevenueAnalytics(unittest.TestCase):
+	"""
+	TestCase class for src/revenue_analytics.py for easy test case running.
+
+	Groups the reference carts by no key, one key, several keys, markup band
+	and price list.
+	"""
+
+	def setUp(self):
+		self.pricedict = BPD.PriceDict()
+		self.pricedict.add_base_price(
+			GJ.get_JSON('ref/base-prices/base-prices.json'))
+
+		self.carts = [GJ.get_JSON('ref/cart/cart-%d.json' % total)
+						for total in (9500, 9363, 4560, 5500, 0, 11356)]
+		self.line_items = RA.load_line_items(self.carts, self.pricedict,
+												'default')
+
+	def test_grand_total(self):
+		# No group keys gives the sum of every cart's calculate()
+		total = sum(CALC.calculate(cart, self.pricedict) for cart in self.carts)
+		self.assertEqual(RA.group_revenue(self.line_items, []), {(): total})
+
+	def test_group_by_options(self):
+		# Products without a colour option are grouped under ''
+		self.assertEqual(
+			RA.group_revenue(self.line_items, ['product-type', 'colour']),
+			{('hoodie', 'dark'): 25416, ('hoodie', 'white'): 9120,
+			('leggings', ''): 5500, ('sticker', ''): 243})
+
+	def test_group_by_markup_band(self):
+		# Markups of 10, 20 and 30 percent fall into three bands
+		self.assertEqual(
+			RA.group_revenue(self.line_items, ['markup-band']),
+			{('10-20',): 5743, ('20-30',): 18240, ('30-50',): 16296})
+
+	def test_group_by_price_list(self):
+		# Concatenated price lists are kept apart
+		other = RA.load_line_items(self.carts[:1], self.pricedict, 'other')
+		line_items = RA.LineItems.concatenate([self.line_items, other])
+		self.assertEqual(
+			RA.group_revenue(line_items, ['price-list']),
+			{('default',): 40279, ('other',): 9500})
+
+	def test_wildcard_rule(self):
+		# Unlisted options are priced through wildcard rules
+		pricejson = GJ.get_JSON('ref/base-prices/base-prices.json')
+		pricejson.append({'product-type': 'sticker', 'options': {},
+							'base-price': 300})
+		pricedict = BPD.PriceDict()
+		pricedict.add_base_price(pricejson)
+		cart = [{'product-type': 'sticker', 'options': {'size': 'tiny'},
+					'artist-markup': 10, 'quantity': 2}]
+		line_items = RA.load_line_items([cart, self.carts[1]], pricedict)
+		self.assertEqual(RA.group_revenue(line_items, ['size']),
+						{('small',): 9363, ('tiny',): 660})
+
+	def test_unlisted_option(self):
+		# Options no entry or rule prices raise, as calculate() does
+		cart = [{'product-type': 'sticker', 'options': {'size': 'tiny'},
+					'artist-markup': 10, 'quantity': 2}]
+		self.assertRaises(KeyError, lambda: CALC.calculate(cart, self.pricedict))
+		self.assertRaises(KeyError,
+			lambda: RA.load_line_items([cart], self.pricedict))
+
+		# So does an item leaving out an option category
+		cart = [{'product-type': 'hoodie', 'options': {'size': 'small'},
+					'artist-markup': 10, 'quantity': 1}]
+		self.assertRaises(KeyError,
+			lambda: RA.load_line_items([cart], self.pricedict))
+
+	def test_wildcard_rule_combinations(self):
+		# Rules are looked up once per distinct option combination
+		pricejson = GJ.get_JSON('ref/base-prices/base-prices.json')
+		pricejson.append({'product-type': 'sticker', 'options': {},
+							'base-price': 300})
+		pricedict = BPD.PriceDict()
+		pricedict.add_base_price(pricejson)
+		lookups = []
+		get_price = pricedict.get_price
+		def counting_get_price(product, option_tuple):
+			lookups.append(option_tuple)
+			return get_price(product, option_tuple)
+		pricedict.get_price = counting_get_price
+
+		carts = [[{'product-type': 'sticker', 'options': {'size': size},
+					'artist-markup': 0, 'quantity': 1}]
+				for size in ['tiny', 'huge', 'tiny', 'small'] * 10]
+		line_items = RA.load_line_items(carts, pricedict)
+		self.assertEqual(RA.group_revenue(line_items, ['size']),
+						{('huge',): 3000, ('small',): 2210, ('tiny',): 6000})
+		# Unlisted sizes all match the same rules
+		self.assertEqual(lookups, [(None,)])
+
+	def test_large_totals(self):
+		# Totals too large for int64 are summed as Python ints
+		self.pricedict.add_base_price([{'product-type': 'leggings',
+			'options': {}, 'base-price': 2 ** 62}])
+		line_items = RA.load_line_items([self.carts[3]] * 3, self.pricedict)
+		total = sum(CALC.calculate(cart, self.pricedict)
+					for cart in [self.carts[3]] * 3)
+		self.assertEqual(RA.group_revenue(line_items, []), {(): total})
+
+	def test_large_rule_price(self):
+		# Rule prices too large for int64 are kept as Python ints
+		pricejson = GJ.get_JSON('ref/base-prices/base-prices.json')
+		pricejson.append({'product-type': 'sticker', 'options': {},
+							'base-price': 2 ** 63 + 5})
+		pricedict = BPD.PriceDict()
+		pricedict.add_base_price(pricejson)
+		cart = [{'product-type': 'sticker', 'options': {'size': 'tiny'},
+					'artist-markup': 0, 'quantity': 1}]
+		line_items = RA.load_line_items([cart, self.carts[1]], pricedict)
+		self.assertEqual(RA.group_revenue(line_items, ['size']),
+						{('small',): 9363, ('tiny',): 2 ** 63 + 5})
+
+	def test_lazy_single_build(self):
+		# Each product is built once, even with a single resident product
+		pricedict = BPD.PriceDict(lazy=True, max_products=1)
+		pricedict.add_base_price(
+			GJ.get_JSON('ref/base-prices/base-prices.json'))
+		builds = []
+		read_entries = pricedict.read_entries
+		def counting_read_entries(product):
+			builds.append(product)
+			return read_entries(product)
+		pricedict.read_entries = counting_read_entries
+
+		RA.load_line_items([self.carts[1], self.carts[3]], pricedict)
+		self.assertEqual(sorted(builds), ['hoodie', 'leggings', 'sticker'])
+
+	def test_many_group_keys(self):
+		# Key cardinalities whose product overflows int64 are still grouped
+		carts = [[{'product-type': 'tee', 'options': {
+					'option-%d' % key: 'value-%d' % item for key in range(6)},
+					'artist-markup': 0, 'quantity': 1}]
+				for item in range(2000)]
+		pricedict = BPD.PriceDict()
+		pricedict.add_base_price([{'product-type': 'tee', 'options': {},
+									'base-price': 100}])
+		line_items = RA.load_line_items(carts, pricedict)
+		group_by = ['option-%d' % key for key in range(6)]
+		groups = RA.group_revenue(line_items, group_by)
+		self.assertEqual(len(groups), 2000)
+		self.assertEqual(groups[('value-7',) * 6], 100)
+
+	def test_no_items(self):
+		# An empty history has no groups
+		line_items = RA.load_line_items([[]], self.pricedict)
+		self.assertEqual(RA.group_revenue(line_items, ['product-type']), {})
+
+
+# Allow this module to be run directly
+if __name__ == "__main__":
+	unittest.main()